@@ -0,0 +1,268 @@
+import os
+from array import array
+from collections import deque
+
+from ChessTables import load_tables
+
+# --- 1. Bitbase Layout ---
+# KRK and KQK are covered. KPK is left out: move_piece never promotes, so a
+# KPK "win" that depends on queening is not a win under the engine's rules.
+# Each ending is stored as one byte per position: 0 for a draw or an illegal
+# position, otherwise 1 + the number of plies to mate with best play by both
+# sides (the longest KRK mate is 32 plies). Knowing the distance lets the
+# search pick the move that brings mate closer rather than any winning move.
+# Positions are indexed from the stronger side's point of view (always shown
+# as white):
+#   index = ((side_to_move * 64 + white_king) * 64 + black_king) * 64 + piece
+# where side_to_move is 0 for white, 1 for black and squares are row * 8 + col
+# in the engine's orientation (row 0 is rank 8).
+ENDINGS = ('R', 'Q')               # KRK, KQK, in file order
+TABLE_POSITIONS = 2 * 64 * 64 * 64
+
+BITBASE_MAGIC = b"CBB3"
+DEFAULT_BITBASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bitbases.bin")
+
+# Score of a won ending at mate distance 0, in the same units as evaluate_board;
+# each ply further from mate scores one less
+WIN_SCORE = 500
+
+def index_of(side_to_move, white_king, black_king, piece):
+    return ((side_to_move * 64 + white_king) * 64 + black_king) * 64 + piece
+
+# --- 2. Geometry Tables ---
+# Shared with the engine through the ChessTables cache
+_tables = load_tables()
+KING_MOVES = _tables.king_targets
+
+# RAYS[kind][sq] is a list of rays, each the squares walked from sq outwards
+RAYS = {
+    'R': _tables.rook_rays,
+    'Q': [_tables.rook_rays[sq] + _tables.bishop_rays[sq] for sq in range(64)],
+}
+
+def kings_touch(a, b):
+    """True if two squares are the same or adjacent."""
+    return abs(a // 8 - b // 8) <= 1 and abs(a % 8 - b % 8) <= 1
+
+def piece_attacks(kind, piece, target, blocker):
+    """True if a white piece on `piece` attacks `target`, with one possible blocker."""
+    for ray in RAYS[kind][piece]:
+        for sq in ray:
+            if sq == target:
+                return True
+            if sq == blocker:
+                break
+    return False
+
+def is_legal(kind, side_to_move, white_king, black_king, piece):
+    """Legal if the squares are distinct, kings apart and the side not to move is not in check."""
+    if white_king == black_king or piece == white_king or piece == black_king:
+        return False
+    if kings_touch(white_king, black_king):
+        return False
+    if side_to_move == 0 and piece_attacks(kind, piece, black_king, white_king):
+        return False
+    return True
+
+# --- 3. Move and Un-Move Generation ---
+
+def white_moves(kind, white_king, black_king, piece):
+    """Yields (white_king, piece) after each legal white move."""
+    for sq in KING_MOVES[white_king]:
+        if sq != piece and not kings_touch(sq, black_king):
+            yield sq, piece
+    for ray in RAYS[kind][piece]:
+        for sq in ray:
+            if sq == white_king or sq == black_king:
+                break
+            yield white_king, sq
+
+def black_moves(kind, white_king, black_king, piece):
+    """Yields black king squares for each legal black move; capturing the piece is included."""
+    for sq in KING_MOVES[black_king]:
+        if kings_touch(sq, white_king):
+            continue
+        if sq != piece and piece_attacks(kind, piece, sq, white_king):
+            continue
+        yield sq
+
+def white_unmoves(kind, white_king, black_king, piece):
+    """Yields (white_king, piece) for positions from which a white move reaches this one."""
+    for sq in KING_MOVES[white_king]:
+        if sq != piece and sq != black_king and not kings_touch(sq, black_king):
+            yield sq, piece
+    for ray in RAYS[kind][piece]:
+        for sq in ray:
+            if sq == white_king or sq == black_king:
+                break
+            yield white_king, sq
+
+# --- 4. Retrograde Analysis ---
+
+def generate_table(kind):
+    """
+    Solves one ending by retrograde analysis and returns it as a bytearray
+    with one byte per position in the file layout (0, or 1 + plies to mate).
+    Positions leave the queue in order of distance, so a winning position is
+    reached first from its quickest mate and a losing one last from its
+    slowest, which makes every stored distance the best-play one.
+    """
+    wins = bytearray(TABLE_POSITIONS)
+    legal = bytearray(TABLE_POSITIONS)
+    remaining = array('b', bytes(TABLE_POSITIONS))   # Black moves not yet known to lose
+    queue = deque()
+
+    for white_king in range(64):
+        for black_king in range(64):
+            for piece in range(64):
+                for side_to_move in (0, 1):
+                    if not is_legal(kind, side_to_move, white_king, black_king, piece):
+                        continue
+                    index = index_of(side_to_move, white_king, black_king, piece)
+                    legal[index] = 1
+                    if side_to_move == 1:
+                        count = sum(1 for _ in black_moves(kind, white_king, black_king, piece))
+                        remaining[index] = count
+                        if count == 0 and piece_attacks(kind, piece, black_king, white_king):
+                            wins[index] = 1   # Checkmate
+                            queue.append(index)
+
+    while queue:
+        index = queue.popleft()
+        distance = wins[index] + 1
+        side_to_move, rest = divmod(index, 64 * 64 * 64)
+        white_king, rest = divmod(rest, 64 * 64)
+        black_king, piece = divmod(rest, 64)
+        if side_to_move == 1:
+            # Black to move loses, so every white move into it wins
+            for old_king, old_piece in white_unmoves(kind, white_king, black_king, piece):
+                previous = index_of(0, old_king, black_king, old_piece)
+                if legal[previous] and not wins[previous]:
+                    wins[previous] = distance
+                    queue.append(previous)
+        else:
+            # White to move wins; black loses once every one of its moves does
+            for old_king in KING_MOVES[black_king]:
+                if old_king == piece or kings_touch(old_king, white_king):
+                    continue
+                previous = index_of(1, white_king, old_king, piece)
+                if legal[previous] and not wins[previous]:
+                    remaining[previous] -= 1
+                    if remaining[previous] == 0:
+                        wins[previous] = distance
+                        queue.append(previous)
+    return wins
+
+def generate_bitbases(path=DEFAULT_BITBASE_PATH, verbose=False):
+    """Generates the KRK and KQK bitbases and writes them to one file."""
+    with open(path, "wb") as f:
+        f.write(BITBASE_MAGIC)
+        for kind in ENDINGS:
+            if verbose:
+                print(f"Solving K{kind}K...")
+            f.write(generate_table(kind))
+    return path
+
+# --- 5. Probing ---
+
+_bitbases = None
+
+def load_bitbases(path=DEFAULT_BITBASE_PATH):
+    """Reads the bitbase file into memory; returns an empty dict if it has not been generated."""
+    global _bitbases
+    if not os.path.exists(path):
+        _bitbases = {}
+        return _bitbases
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(BITBASE_MAGIC)] != BITBASE_MAGIC or \
+       len(data) != len(BITBASE_MAGIC) + TABLE_POSITIONS * len(ENDINGS):
+        raise ValueError(f"{path}: not a bitbase file, regenerate it")
+    offset = len(BITBASE_MAGIC)
+    _bitbases = {}
+    for kind in ENDINGS:
+        _bitbases[kind] = data[offset:offset + TABLE_POSITIONS]
+        offset += TABLE_POSITIONS
+    return _bitbases
+
+def lookup(board, color):
+    """
+    Looks up a KRK or KQK position with `color` to move. Returns (strong, entry)
+    with `strong` the side with the extra piece and `entry` the stored byte,
+    or None when the position is not covered (wrong material or bitbases not
+    generated).
+    """
+    tables = _bitbases if _bitbases is not None else load_bitbases()
+    if not tables:
+        return None
+
+    pieces = []
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece is not None:
+                pieces.append((piece, row, col))
+                if len(pieces) > 3:
+                    return None
+    extra = [p for p in pieces if p[0].lower() != 'k']
+    if len(pieces) != 3 or len(extra) != 1 or extra[0][0].upper() not in ENDINGS:
+        return None
+
+    # Flip the board when black is the stronger side so it is always "white"
+    strong = 'white' if extra[0][0].isupper() else 'black'
+    squares = {}
+    for piece, row, col in pieces:
+        if strong == 'black':
+            row = 7 - row
+        if piece.lower() == 'k':
+            squares['strong_king' if (piece == 'K') == (strong == 'white') else 'weak_king'] = row * 8 + col
+        else:
+            squares['piece'] = row * 8 + col
+    if len(squares) != 3:
+        return None
+
+    kind = extra[0][0].upper()
+    side_to_move = 0 if color == strong else 1
+    index = index_of(side_to_move, squares['strong_king'], squares['weak_king'], squares['piece'])
+    return strong, tables[kind][index]
+
+def probe(board, color):
+    """
+    Looks up a KRK or KQK position with `color` to move.
+    Returns 'white' or 'black' for the winning side, 'draw', or None when the
+    position is not covered.
+    """
+    found = lookup(board, color)
+    if found is None:
+        return None
+    strong, entry = found
+    return strong if entry else 'draw'
+
+def probe_score(board, color):
+    """
+    Returns a score for a bitbase position, from white's point of view like
+    evaluate_board, or None if the position is not covered. A draw is exactly
+    0. A win scores WIN_SCORE minus the plies to mate, far below a mate score
+    so the search still plays a mate it can see, and higher the closer the
+    mate so that the winning side always makes progress towards it.
+    """
+    found = lookup(board, color)
+    if found is None:
+        return None
+    strong, entry = found
+    if not entry:
+        return 0
+    score = WIN_SCORE - (entry - 1)
+    return score if strong == 'white' else -score
+
+def main():
+    """Command-line entry point: generate the bitbase file."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate KRK and KQK bitbases by retrograde analysis.")
+    parser.add_argument("-o", "--output", default=DEFAULT_BITBASE_PATH, help="bitbase file to write")
+    args = parser.parse_args()
+    generate_bitbases(args.output, verbose=True)
+    print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import copy
+import time
+from array import array
 
-# --- 1. Global Constants and Initial Board Setup ---
-# Define the 8x8 board
-board = [[None for _ in range(8)] for _ in range(8)]
+from ChessTables import load_tables, ZOBRIST_PIECES
 
+# --- 1. Global Constants and Initial Board Setup ---
 # Piece notation:
 # White pieces - uppercase: P, R, N, B, Q, K
 # Black pieces - lowercase: p, r, n, b, q, k
@@ -15,12 +16,36 @@ white_pawns = ['P'] * 8
 black_back_row = ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r']
 black_pawns = ['p'] * 8
 
-# Place the pieces on the board
-board[0] = black_back_row        # Black back rank
-board[1] = black_pawns          # Black pawns
-board[2:6] = [[None]*8 for _ in range(4)]   # Empty rows in between
-board[6] = white_pawns           # White pawns
-board[7] = white_back_row        # White back rank
+def initial_board():
+    """Returns a new board in the starting position, independent of the global `board`."""
+    return [
+        black_back_row[:],         # Black back rank
+        black_pawns[:],            # Black pawns
+        [None]*8, [None]*8, [None]*8, [None]*8,   # Empty rows in between
+        white_pawns[:],            # White pawns
+        white_back_row[:],         # White back rank
+    ]
+
+def __getattr__(name):
+    """
+    Builds the shared global `board` the first time it is used, so importing
+    this module has no side effects. Prefer initial_board() for new code.
+    """
+    if name == 'board':
+        globals()['board'] = initial_board()
+        return globals()['board']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# The bitbase prober is imported on first use; most searches never reach
+# a position with three pieces left
+_bitbase_probe_score = None
+
+def probe_score(board, color):
+    """Bitbase score for the position, or None; see ChessBitbase.probe_score."""
+    global _bitbase_probe_score
+    if _bitbase_probe_score is None:
+        from ChessBitbase import probe_score as _bitbase_probe_score
+    return _bitbase_probe_score(board, color)
 
 # --- 2. Helper Functions (General Utilities) ---
 
@@ -381,17 +406,19 @@ def get_all_valid_moves(board, start_pos, color):
 
 # --- 6. Game State Evaluation (for AI and End Conditions) ---
 
+# Material from white's point of view; built once rather than on every call
+BOARD_PIECE_VALUES = {
+    'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 1000,
+    'p': -1, 'n': -3, 'b': -3, 'r': -5, 'q': -9, 'k': -1000
+}
+
 def evaluate_board(board):
     """Evaluates the board state for the AI."""
-    piece_values = {
-        'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 1000,
-        'p': -1, 'n': -3, 'b': -3, 'r': -5, 'q': -9, 'k': -1000
-    }
     score = 0
     for row in board:
         for piece in row:
             if piece:
-                score += piece_values.get(piece, 0)
+                score += BOARD_PIECE_VALUES.get(piece, 0)
     return score
 
 def get_all_moves(board, color):
@@ -418,58 +445,15 @@ def get_all_moves(board, color):
 def is_in_check(board, color):
     """Checks if the king of the given color is currently in check."""
     # Find the king's position
-    king_pos = None
-    for row in range(8):
-        for col in range(8):
-            if (color == 'white' and board[row][col] == 'K') or \
-               (color == 'black' and board[row][col] == 'k'):
-                king_pos = (row, col)
-                break
-        if king_pos:
-            break
-    
-    if not king_pos:
-        return False   # No king found (should ideally not happen in a valid game)
-
-    # Check if any of the opponent's pieces can attack the king's position
-    opponent_color = 'black' if color == 'white' else 'white'
+    king = 'K' if color == 'white' else 'k'
     for row in range(8):
         for col in range(8):
-            piece = board[row][col]
-            if piece is not None and \
-               ((color == 'white' and piece.islower()) or \
-                (color == 'black' and piece.isupper())):
-                
-                # Create a temporary board to check hypothetical attacks without changing main board
-                # This deepcopy is crucial to avoid modifying the actual board during hypothetical checks
-                temp_board_for_attack_check = copy.deepcopy(board) 
-                
-                opponent_piece_type = piece.lower()
-                can_attack = False
-                # For checking attack, we need to consider how pieces *attack*, not just how they move normally
-                # Pawns attack diagonally, other pieces attack by moving onto the square.
-                if opponent_piece_type == 'p':
-                    direction = -1 if opponent_color == 'white' else 1
-                    # Pawns attack diagonally
-                    if (king_pos[0] == row + direction and abs(king_pos[1] - col) == 1):
-                        can_attack = True
-                elif opponent_piece_type == 'r':
-                    can_attack = is_valid_rook_move(temp_board_for_attack_check, (row, col), king_pos)
-                elif opponent_piece_type == 'n':
-                    can_attack = is_valid_knight_move((row, col), king_pos)
-                elif opponent_piece_type == 'b':
-                    can_attack = is_valid_bishop_move(temp_board_for_attack_check, (row, col), king_pos)
-                elif opponent_piece_type == 'q':
-                    can_attack = is_valid_queen_move(temp_board_for_attack_check, (row, col), king_pos)
-                elif opponent_piece_type == 'k':
-                    # A king can attack an opponent's king if they are adjacent
-                    # This check is mainly to ensure kings don't move into adjacent squares
-                    can_attack = is_valid_king_move((row, col), king_pos)
-                
-                if can_attack:
-                    return True   # The king is in check
+            if board[row][col] == king:
+                # Look outwards from the king with the precomputed attack tables
+                # instead of testing every opponent piece on a copied board
+                return square_attacked(board, row * 8 + col, color == 'black')
 
-    return False   # The king is not in check
+    return False   # No king found (should ideally not happen in a valid game)
 
 
 def is_checkmate(board, color):
@@ -545,14 +529,25 @@ def minimax(board, depth, is_maximizing, color):
                 best_move = move
         return min_eval, best_move
 
-def alphabeta(board, depth, alpha, beta, maximizing_player, color):
+def alphabeta(board, depth, alpha, beta, maximizing_player, color, ply=0):
     """
     Alpha-Beta pruning search.
     Returns (best_score, best_move)
     """
+    # Checkmate is scored before the bitbases so a won ending never outscores it
+    if is_checkmate(board, color):
+        return (-MATE_SCORE + ply if color == 'white' else MATE_SCORE - ply), None
+
+    # Positions with few pieces left are looked up in the bitbases: draws are
+    # final, wins keep searching and are scored from the bitbase at the leaves.
+    # The root is never probed since it has to return a move.
+    endgame_score = probe_score(board, color) if ply > 0 else None
+    if endgame_score == 0:
+        return 0, None
+
     # Terminal or quiescence test
-    if depth == 0 or is_checkmate(board, color) or is_stalemate(board, color):
-        return evaluate_board(board), None
+    if depth == 0 or is_stalemate(board, color):
+        return (evaluate_board(board) if endgame_score is None else endgame_score), None
 
     best_move = None
     opponent_color = 'black' if color == 'white' else 'white'
@@ -562,7 +557,7 @@ def alphabeta(board, depth, alpha, beta, maximizing_player, color):
         for move in get_all_moves(board, color):
             new_board = copy.deepcopy(board)
             move_piece(new_board, move[0], move[1])
-            score, _ = alphabeta(new_board, depth - 1, alpha, beta, False, opponent_color)
+            score, _ = alphabeta(new_board, depth - 1, alpha, beta, False, opponent_color, ply + 1)
             if score > value:
                 value, best_move = score, move
             alpha = max(alpha, value)
@@ -574,7 +569,7 @@ def alphabeta(board, depth, alpha, beta, maximizing_player, color):
         for move in get_all_moves(board, color):
             new_board = copy.deepcopy(board)
             move_piece(new_board, move[0], move[1])
-            score, _ = alphabeta(new_board, depth - 1, alpha, beta, True, opponent_color)
+            score, _ = alphabeta(new_board, depth - 1, alpha, beta, True, opponent_color, ply + 1)
             if score < value:
                 value, best_move = score, move
             beta = min(beta, value)
@@ -582,17 +577,566 @@ def alphabeta(board, depth, alpha, beta, maximizing_player, color):
                 break   # α-cutoff
         return value, best_move
 
-def get_best_move_ab(board, color, depth=3):
+# --- Selective Search ---
+# Each feature can be switched off (e.g. get_best_move_ab(..., features={'null_move': False}))
+# to A/B test it against the full-width search.
+SEARCH_FEATURES = {
+    'null_move': True,
+    'late_move_reductions': True,
+    'futility': True,
+    'razoring': True,
+    'check_extensions': True,
+    'pvs': True,
+    'aspiration': True,
+}
+
+PIECE_VALUES = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 1000}
+MATE_SCORE = 100000
+MAX_SEARCH_PLY = 32             # Check extensions stop here so perpetual checks terminate
+
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+LMR_MIN_DEPTH = 3
+LMR_FULL_DEPTH_MOVES = 3        # Moves searched at full depth before reductions start
+FUTILITY_MARGINS = {1: 2, 2: 4}  # Indexed by remaining depth, in evaluate_board units
+RAZOR_MARGINS = {2: 5, 3: 9}
+ASPIRATION_WINDOW = 2           # Half-width of the first window around the previous score
+TT_MAX_ENTRIES = 200000         # Stores stop once a transposition table holds this many positions
+
+class SearchTimeout(Exception):
+    """Raised inside the search when its deadline passes."""
+
+# --- Transposition Table ---
+# Positions are keyed by a Zobrist hash: the XOR of one fixed random 64-bit
+# number per (piece, square), plus one for black to move. The numbers come from
+# a fixed seed so keys are the same in every process. Like the attack tables
+# below, they come from ChessTables, which reads its cache file when present.
+_tables = load_tables()
+ZOBRIST_KEYS = {piece: _tables.zobrist[i * 64:(i + 1) * 64] for i, piece in enumerate(ZOBRIST_PIECES)}
+ZOBRIST_BLACK_TO_MOVE = _tables.zobrist[-1]
+
+TT_EXACT, TT_LOWER, TT_UPPER = 0, 1, 2
+
+def zobrist_key(board, color):
+    """Returns the 64-bit Zobrist hash of a position with `color` to move."""
+    key = ZOBRIST_BLACK_TO_MOVE if color == 'black' else 0
+    for row in range(8):
+        board_row = board[row]
+        for col in range(8):
+            piece = board_row[col]
+            if piece is not None:
+                key ^= ZOBRIST_KEYS[piece][row * 8 + col]
+    return key
+
+def tt_store(tt, key, depth, score, flag, move, ply):
+    """Stores a search result; mate scores are saved relative to this node, not the root."""
+    if len(tt) >= TT_MAX_ENTRIES and key not in tt:
+        return
+    if score >= MATE_SCORE - MAX_SEARCH_PLY:
+        score += ply
+    elif score <= -MATE_SCORE + MAX_SEARCH_PLY:
+        score -= ply
+    tt[key] = (depth, score, flag, move)
+
+def tt_probe(tt, key, ply):
+    """Returns (depth, score, flag, move) for a stored position, or None."""
+    entry = tt.get(key)
+    if entry is None:
+        return None
+    depth, score, flag, move = entry
+    if score >= MATE_SCORE - MAX_SEARCH_PLY:
+        score -= ply
+    elif score <= -MATE_SCORE + MAX_SEARCH_PLY:
+        score += ply
+    return depth, score, flag, move
+
+# --- Compact Move Encoding ---
+# Inside the search a move is a 16-bit int rather than a pair of tuples:
+#   bits 0-5 from square, bits 6-11 to square (square = row * 8 + col),
+#   bit 12 capture, bit 15 promotion with the piece in bits 13-14 (n, b, r, q).
+# move_piece never promotes, so the search does not emit promotions; the bits
+# keep the format complete. Moves are generated into preallocated array('H')
+# buffers, one per ply, and made and unmade in place on a single board.
+MOVE_CAPTURE = 1 << 12
+MOVE_PROMOTION = 1 << 15
+PROMOTION_SHIFT = 13
+PROMOTION_PIECES = 'nbrq'
+MAX_MOVES = 256                 # Per-ply buffer size; no position has more legal moves
+
+def encode_move(start_pos, end_pos, capture=False, promotion=None):
+    """Packs ((r1, c1), (r2, c2)) into a 16-bit move."""
+    move = (start_pos[0] * 8 + start_pos[1]) | ((end_pos[0] * 8 + end_pos[1]) << 6)
+    if capture:
+        move |= MOVE_CAPTURE
+    if promotion:
+        move |= MOVE_PROMOTION | (PROMOTION_PIECES.index(promotion.lower()) << PROMOTION_SHIFT)
+    return move
+
+def decode_move(move):
+    """Unpacks a 16-bit move into ((r1, c1), (r2, c2))."""
+    start, end = move & 63, (move >> 6) & 63
+    return (start >> 3, start & 7), (end >> 3, end & 7)
+
+KNIGHT_TARGETS = _tables.knight_targets
+KING_TARGETS = _tables.king_targets
+ROOK_RAYS = _tables.rook_rays
+BISHOP_RAYS = _tables.bishop_rays
+QUEEN_RAYS = [ROOK_RAYS[sq] + BISHOP_RAYS[sq] for sq in range(64)]
+SLIDER_RAYS = {'r': ROOK_RAYS, 'b': BISHOP_RAYS, 'q': QUEEN_RAYS}
+
+def square_attacked(board, sq, by_white):
+    """True if a piece of the given side attacks square `sq`."""
+    row, col = sq >> 3, sq & 7
+    if by_white:
+        pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+        pawn_row = row + 1
+    else:
+        pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+        pawn_row = row - 1
+    if 0 <= pawn_row < 8:
+        attackers = board[pawn_row]
+        if (col > 0 and attackers[col - 1] == pawn) or (col < 7 and attackers[col + 1] == pawn):
+            return True
+    for target in KNIGHT_TARGETS[sq]:
+        if board[target >> 3][target & 7] == knight:
+            return True
+    for target in KING_TARGETS[sq]:
+        if board[target >> 3][target & 7] == king:
+            return True
+    for ray in ROOK_RAYS[sq]:
+        for target in ray:
+            piece = board[target >> 3][target & 7]
+            if piece is not None:
+                if piece == rook or piece == queen:
+                    return True
+                break
+    for ray in BISHOP_RAYS[sq]:
+        for target in ray:
+            piece = board[target >> 3][target & 7]
+            if piece is not None:
+                if piece == bishop or piece == queen:
+                    return True
+                break
+    return False
+
+def generate_moves(board, color, moves):
+    """
+    Writes the pseudo-legal moves for `color` into the array('H') buffer
+    `moves` and returns how many there are. Follows the same rules as
+    get_all_moves except that moves leaving the king in check are included.
+    """
+    white = color == 'white'
+    count = 0
+    for sq in range(64):
+        piece = board[sq >> 3][sq & 7]
+        if piece is None or piece.isupper() != white:
+            continue
+        kind = piece.lower()
+        if kind == 'p':
+            row, col = sq >> 3, sq & 7
+            step = -8 if white else 8
+            ahead_row = row - 1 if white else row + 1
+            if not 0 <= ahead_row < 8:
+                continue
+            ahead = sq + step
+            if board[ahead_row][col] is None:
+                moves[count] = sq | (ahead << 6)
+                count += 1
+                if row == (6 if white else 1) and board[row + 2 * (ahead_row - row)][col] is None:
+                    moves[count] = sq | ((ahead + step) << 6)
+                    count += 1
+            for delta in (-1, 1):
+                target_col = col + delta
+                if 0 <= target_col < 8:
+                    target = board[ahead_row][target_col]
+                    if target is not None and target.isupper() != white and target.lower() != 'k':
+                        moves[count] = sq | ((ahead_row * 8 + target_col) << 6) | MOVE_CAPTURE
+                        count += 1
+        elif kind == 'n' or kind == 'k':
+            for target_sq in (KNIGHT_TARGETS[sq] if kind == 'n' else KING_TARGETS[sq]):
+                target = board[target_sq >> 3][target_sq & 7]
+                if target is None:
+                    moves[count] = sq | (target_sq << 6)
+                    count += 1
+                elif target.isupper() != white and target.lower() != 'k':
+                    moves[count] = sq | (target_sq << 6) | MOVE_CAPTURE
+                    count += 1
+        else:
+            for ray in SLIDER_RAYS[kind][sq]:
+                for target_sq in ray:
+                    target = board[target_sq >> 3][target_sq & 7]
+                    if target is None:
+                        moves[count] = sq | (target_sq << 6)
+                        count += 1
+                        continue
+                    if target.isupper() != white and target.lower() != 'k':
+                        moves[count] = sq | (target_sq << 6) | MOVE_CAPTURE
+                        count += 1
+                    break
+    return count
+
+class SearchStack:
+    """
+    Per-search state preallocated for every ply: move and ordering-score
+    buffers, the undo stack of captured pieces, incrementally updated Zobrist
+    keys, king squares and the piece count used to gate bitbase probes.
+    Moves are made and unmade in place, so a node allocates no boards or lists.
+    """
+
+    def __init__(self, board, color, ply=0):
+        size = MAX_SEARCH_PLY + 2
+        self.moves = [array('H', bytes(2 * MAX_MOVES)) for _ in range(size)]
+        self.scores = [array('i', bytes(4 * MAX_MOVES)) for _ in range(size)]
+        self.captured = [None] * size
+        self.keys = array('Q', bytes(8 * size))
+        self.keys[ply] = zobrist_key(board, color)
+        self.king_squares = [-1, -1]    # White, black; -1 if the king is missing
+        self.piece_count = 0
+        for sq in range(64):
+            piece = board[sq >> 3][sq & 7]
+            if piece is not None:
+                self.piece_count += 1
+                if piece == 'K':
+                    self.king_squares[0] = sq
+                elif piece == 'k':
+                    self.king_squares[1] = sq
+
+    def make(self, board, move, ply):
+        """Plays `move` on the board, recording what is needed to take it back."""
+        start, end = move & 63, (move >> 6) & 63
+        start_row, end_row = board[start >> 3], board[end >> 3]
+        piece = start_row[start & 7]
+        captured = end_row[end & 7]
+        self.captured[ply] = captured
+        end_row[end & 7] = piece
+        start_row[start & 7] = None
+
+        piece_keys = ZOBRIST_KEYS[piece]
+        key = self.keys[ply] ^ piece_keys[start] ^ piece_keys[end] ^ ZOBRIST_BLACK_TO_MOVE
+        if captured is not None:
+            key ^= ZOBRIST_KEYS[captured][end]
+            self.piece_count -= 1
+        self.keys[ply + 1] = key
+        if piece == 'K':
+            self.king_squares[0] = end
+        elif piece == 'k':
+            self.king_squares[1] = end
+
+    def unmake(self, board, move, ply):
+        """Takes back the move made at `ply`."""
+        start, end = move & 63, (move >> 6) & 63
+        start_row, end_row = board[start >> 3], board[end >> 3]
+        piece = end_row[end & 7]
+        captured = self.captured[ply]
+        start_row[start & 7] = piece
+        end_row[end & 7] = captured
+        if captured is not None:
+            self.piece_count += 1
+        if piece == 'K':
+            self.king_squares[0] = start
+        elif piece == 'k':
+            self.king_squares[1] = start
+
+    def is_legal(self, board, move, ply, white):
+        """True if `move` does not leave the mover's own king attacked."""
+        self.make(board, move, ply)
+        king = self.king_squares[0 if white else 1]
+        legal = king < 0 or not square_attacked(board, king, not white)
+        self.unmake(board, move, ply)
+        return legal
+
+class PrincipalVariation:
+    """
+    Triangular PV table: row `ply` holds the best line found from that ply,
+    built by prefixing the best move to the line of the row below.
+    `previous` is the line from the last completed iteration, which the
+    search tries first.
+    """
+
+    def __init__(self):
+        self.moves = [[None] * (MAX_SEARCH_PLY + 1) for _ in range(MAX_SEARCH_PLY + 1)]
+        self.length = [0] * (MAX_SEARCH_PLY + 2)
+        self.previous = []
+
+    def clear(self, ply):
+        self.length[ply] = ply
+
+    def update(self, ply, move):
+        row, child = self.moves[ply], self.moves[ply + 1]
+        row[ply] = move
+        for i in range(ply + 1, self.length[ply + 1]):
+            row[i] = child[i]
+        self.length[ply] = max(self.length[ply + 1], ply + 1)
+
+    def line(self):
+        return self.moves[0][:self.length[0]]
+
+def has_non_pawn_material(board, color):
+    """True if the side has a piece other than pawns and king (null-move zugzwang guard)."""
+    for row in board:
+        for piece in row:
+            if piece is not None and piece.lower() in 'nbrq' and \
+               (piece.isupper() if color == 'white' else piece.islower()):
+                return True
+    return False
+
+def score_moves(board, moves, scores, count, first=0):
+    """
+    Fills `scores` for ordering: captures first, most valuable victim / least
+    valuable attacker (MVV-LVA). `first`, typically the move from the previous
+    principal variation, goes ahead of all.
+    """
+    for i in range(count):
+        move = moves[i]
+        if move == first:
+            scores[i] = 1 << 30
+        elif move & MOVE_CAPTURE:
+            start, end = move & 63, (move >> 6) & 63
+            victim = board[end >> 3][end & 7].lower()
+            attacker = board[start >> 3][start & 7].lower()
+            scores[i] = 10 * PIECE_VALUES[victim] - PIECE_VALUES[attacker] + 10000
+        else:
+            scores[i] = 0
+
+def pick_move(moves, scores, index, count):
+    """Swaps the best-scored move still unsearched into `index` and returns it."""
+    best = index
+    for i in range(index + 1, count):
+        if scores[i] > scores[best]:
+            best = i
+    if best != index:
+        moves[index], moves[best] = moves[best], moves[index]
+        scores[index], scores[best] = scores[best], scores[index]
+    return moves[index]
+
+def negamax(board, depth, alpha, beta, color, ply=0, features=None, allow_null=True, pv=None, on_pv=False,
+            tt=None, deadline=None, stack=None):
+    """
+    Principal variation search in negamax form with selective extensions and
+    pruning: check extensions, null-move pruning, razoring, futility pruning
+    and late move reductions, each controlled by `features` (defaults to
+    SEARCH_FEATURES). After the first move, moves are searched with a null
+    window and re-searched only if they land inside (alpha, beta).
+    Scores are from the point of view of `color`, the side to move. The best
+    line is recorded in `pv`; `on_pv` marks nodes along pv.previous.
+    `tt` is an optional dict used as transposition table, and SearchTimeout is
+    raised once time.monotonic() passes `deadline`. Moves are made in place on
+    `board` and taken back, except when SearchTimeout unwinds the search.
+    Returns (best_score, best_move) with best_move a 16-bit encoded move.
+    """
+    if features is None:
+        features = SEARCH_FEATURES
+    if pv is None:
+        pv = PrincipalVariation()
+    if stack is None:
+        stack = SearchStack(board, color, ply)
+    pv.clear(ply)
+    if deadline is not None and time.monotonic() > deadline:
+        raise SearchTimeout()
+    white = color == 'white'
+    side_sign = 1 if white else -1
+    opponent_color = 'black' if white else 'white'
+
+    # A drawn bitbase position is final. A won one is still searched, so that
+    # real mates are found, and its bitbase score replaces the evaluation.
+    endgame_score = None
+    if ply > 0 and stack.piece_count <= 3:
+        endgame_score = probe_score(board, color)
+        if endgame_score == 0:
+            return 0, None
+
+    king = stack.king_squares[0 if white else 1]
+    in_check = king >= 0 and square_attacked(board, king, not white)
+    if in_check and features['check_extensions'] and ply < MAX_SEARCH_PLY:
+        depth += 1
+
+    # Checked before generating moves; stored positions always have a legal move
+    tt_move = 0
+    key = stack.keys[ply]
+    if tt is not None:
+        entry = tt_probe(tt, key, ply)
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, tt_move = entry
+            # The root always searches so that it has a move to return. Only
+            # scores outside the window cut off: one inside it would become part
+            # of the principal variation, and the table does not keep the line.
+            if ply > 0 and entry_depth >= depth and (
+                    (entry_flag != TT_UPPER and entry_score >= beta) or
+                    (entry_flag != TT_LOWER and entry_score <= alpha)):
+                return entry_score, tt_move
+    original_alpha = alpha
+
+    moves = stack.moves[ply]
+    count = generate_moves(board, color, moves)
+    if depth <= 0 or ply >= MAX_SEARCH_PLY:
+        # A leaf only needs to know whether any legal move exists
+        for i in range(count):
+            if stack.is_legal(board, moves[i], ply, white):
+                if endgame_score is not None:
+                    return side_sign * endgame_score, None
+                return side_sign * evaluate_board(board), None
+        return (-MATE_SCORE + ply if in_check else 0), None
+
+    legal_count = 0
+    for i in range(count):
+        if stack.is_legal(board, moves[i], ply, white):
+            moves[legal_count] = moves[i]
+            legal_count += 1
+    count = legal_count
+    if count == 0:
+        # Checkmate (prefer the quickest mate) or stalemate
+        return (-MATE_SCORE + ply if in_check else 0), None
+
+    static_eval = side_sign * (evaluate_board(board) if endgame_score is None else endgame_score)
+    if ply > 0 and not in_check:
+        # Razoring: even winning a rook or queen would not reach alpha
+        if features['razoring'] and depth in RAZOR_MARGINS and \
+           static_eval + RAZOR_MARGINS[depth] <= alpha:
+            return static_eval, None
+
+        # Null move: if passing still fails high, a real move will too.
+        # Not tried twice in a row or without pieces, where zugzwang is likely.
+        if features['null_move'] and allow_null and depth >= NULL_MOVE_MIN_DEPTH and \
+           static_eval >= beta and has_non_pawn_material(board, color):
+            stack.keys[ply + 1] = key ^ ZOBRIST_BLACK_TO_MOVE
+            score, _ = negamax(board, depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + 1,
+                               opponent_color, ply + 1, features, allow_null=False, pv=pv,
+                               tt=tt, deadline=deadline, stack=stack)
+            score = -score
+            if score >= beta:
+                return beta, None
+
+    futile = features['futility'] and ply > 0 and not in_check and \
+        depth in FUTILITY_MARGINS and static_eval + FUTILITY_MARGINS[depth] <= alpha
+
+    pv_move = pv.previous[ply] if on_pv and ply < len(pv.previous) else 0
+    scores = stack.scores[ply]
+    score_moves(board, moves, scores, count, pv_move or tt_move)
+
+    best_score = float('-inf')
+    best_move = None
+    for move_number in range(count):
+        move = pick_move(moves, scores, move_number, count)
+        child_on_pv = move == pv_move
+        quiet = not move & MOVE_CAPTURE
+        stack.make(board, move, ply)
+        opponent_king = stack.king_squares[1 if white else 0]
+        gives_check = opponent_king >= 0 and square_attacked(board, opponent_king, white)
+
+        # Futility: near the leaves a quiet move cannot make up the deficit
+        if futile and quiet and not gives_check and move_number > 0:
+            stack.unmake(board, move, ply)
+            continue
+
+        # Late move reductions: quiet moves ordered late are searched
+        # shallower with a null window and re-searched only if they beat alpha
+        reduction = 0
+        if features['late_move_reductions'] and depth >= LMR_MIN_DEPTH and \
+           move_number >= LMR_FULL_DEPTH_MOVES and quiet and not in_check and not gives_check:
+            reduction = 2 if move_number >= 2 * LMR_FULL_DEPTH_MOVES and depth >= 5 else 1
+
+        if move_number == 0 or not (features['pvs'] or reduction):
+            score, _ = negamax(board, depth - 1, -beta, -alpha, opponent_color, ply + 1, features,
+                               pv=pv, on_pv=child_on_pv, tt=tt, deadline=deadline, stack=stack)
+            score = -score
+        else:
+            score, _ = negamax(board, depth - 1 - reduction, -alpha - 1, -alpha, opponent_color, ply + 1,
+                               features, pv=pv, on_pv=child_on_pv, tt=tt, deadline=deadline, stack=stack)
+            score = -score
+            if score > alpha and reduction and features['pvs']:
+                # The reduced search beat alpha: verify at full depth, still with a null window
+                score, _ = negamax(board, depth - 1, -alpha - 1, -alpha, opponent_color, ply + 1,
+                                   features, pv=pv, on_pv=child_on_pv, tt=tt, deadline=deadline, stack=stack)
+                score = -score
+            if alpha < score < beta or (score > alpha and not features['pvs']):
+                score, _ = negamax(board, depth - 1, -beta, -alpha, opponent_color, ply + 1, features,
+                                   pv=pv, on_pv=child_on_pv, tt=tt, deadline=deadline, stack=stack)
+                score = -score
+        stack.unmake(board, move, ply)
+
+        if score > best_score:
+            best_score, best_move = score, move
+        if score > alpha:
+            alpha = score
+            pv.update(ply, move)
+        if alpha >= beta:
+            break   # β-cutoff
+
+    if tt is not None and best_move is not None:
+        if best_score <= original_alpha:
+            flag = TT_UPPER
+        elif best_score >= beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        tt_store(tt, key, depth, best_score, flag, best_move, ply)
+    return best_score, best_move
+
+def iterative_deepening(board, color, depth, features=None, tt=None, time_limit=None):
+    """
+    Searches depth 1, 2, ... up to `depth`, trying the previous principal
+    variation first at each iteration. From depth 2 on, the search starts in
+    an aspiration window around the previous score and widens it on a fail
+    low or fail high. With a `time_limit` in seconds, the search stops when
+    it runs out and keeps the result of the last completed iteration.
+    Returns (score, principal_variation) with the score from `color`'s side
+    and the variation as ((r1, c1), (r2, c2)) moves.
+    """
+    if features is None:
+        features = SEARCH_FEATURES
+    if tt is None:
+        tt = {}
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    # The search works on its own copy, which a timeout may leave mid-move
+    board = [row[:] for row in board]
+    stack = SearchStack(board, color)
+    pv = PrincipalVariation()
+    score = 0
+    best_score = 0
+    for current_depth in range(1, depth + 1):
+        delta = ASPIRATION_WINDOW
+        if features['aspiration'] and current_depth > 1:
+            alpha, beta = score - delta, score + delta
+        else:
+            alpha, beta = float('-inf'), float('inf')
+        while True:
+            try:
+                score, _ = negamax(board, current_depth, alpha, beta, color, features=features,
+                                   pv=pv, on_pv=True, tt=tt, deadline=deadline, stack=stack)
+            except SearchTimeout:
+                return best_score, [decode_move(move) for move in pv.previous]
+            if score <= alpha:
+                delta *= 4
+                alpha = score - delta if delta <= 4 * 4 * ASPIRATION_WINDOW else float('-inf')
+            elif score >= beta:
+                delta *= 4
+                beta = score + delta if delta <= 4 * 4 * ASPIRATION_WINDOW else float('inf')
+            else:
+                break
+        pv.previous = pv.line()
+        best_score = score
+    return best_score, [decode_move(move) for move in pv.previous]
+
+def get_best_move_ab(board, color, depth=3, book=None, features=None, tt=None, time_limit=None):
     """
     Returns the best move found by alpha-beta search to the given depth.
+    If an opening book is given and knows the position, its move is played
+    without searching. `features` overrides entries of SEARCH_FEATURES; `tt`
+    and `time_limit` are passed on to iterative_deepening.
     """
+    if book is not None:
+        book_move = book.pick_move(board, color)
+        if book_move:
+            return book_move
+
     # Check if there are any legal moves at all for the current player
     all_possible_moves = get_all_moves(board, color)
     if not all_possible_moves:
         return None # Indicate no moves available
         
-    _, move = alphabeta(board, depth, float('-inf'), float('inf'), True, color)
-    return move
+    search_features = dict(SEARCH_FEATURES, **(features or {}))
+    _, line = iterative_deepening(board, color, depth, search_features, tt, time_limit)
+    return line[0] if line else all_possible_moves[0]
 
 # --- 9. User Input / Console Game Turn Handling ---
 
@@ -619,13 +1163,10 @@ def get_move_input(board, color):
 def main():
     """Main function to run the console chess game."""
     # Reinitialize board for the game loop (global 'board' might be modified by tests)
-    game_board = [
-        ['r', 'n', 'b', 'q', 'k', 'b', 'n', 'r'],
-        ['p', 'p', 'p', 'p', 'p', 'p', 'p', 'p'],
-        [None]*8, [None]*8, [None]*8, [None]*8,
-        ['P', 'P', 'P', 'P', 'P', 'P', 'P', 'P'],
-        ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
-    ]
+    game_board = initial_board()
+    # Imported here because the book module itself imports from this one
+    from ChessOpeningBook import open_default_book
+    book = open_default_book()
 
     while True:
         # --- White (human) move ---
@@ -659,7 +1200,7 @@ def main():
         print("\n--- Black's Turn (AI) ---")
         print("AI (black) is thinking...")
         
-        best_move = get_best_move_ab(game_board, 'black', depth=3) # Using depth=3 as before
+        best_move = get_best_move_ab(game_board, 'black', depth=3, book=book) # Using depth=3 as before
 
         if best_move:
             move_piece(game_board, best_move[0], best_move[1])
@@ -0,0 +1,350 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from ChessBoardOrganised import (
+    initial_board,
+    move_piece,
+    is_valid_move,
+    parse_move,
+    indices_to_chess_notation,
+    get_all_moves,
+    is_checkmate,
+    is_stalemate,
+    iterative_deepening,
+)
+
+# --- 1. Protocol and Limits ---
+# The service speaks newline-delimited JSON over TCP on localhost. Every request
+# is an object with a "cmd" and optionally an "id" that is echoed back:
+#   {"cmd": "new"}                                    -> {"session": ..., "turn": "white"}
+#   {"cmd": "move", "session": s, "move": "e2 to e4"} -> {"turn": ..., "status": ...}
+#   {"cmd": "go", "session": s, "depth": 4, "time_limit": 2.0, "play": true}
+#                                                     -> {"move": ..., "score": ..., "pv": [...]}
+#     A move from the opening book comes back unsearched, with "book": true and
+#     "score": null; send "book": false to always search.
+#   {"cmd": "board", "session": s}                    -> {"board": [8 strings], "turn": ...}
+#   {"cmd": "close", "session": s}
+#   {"cmd": "stats"}                                  -> {"sessions": ..., "pending": ...}
+# Replies carry "ok": true, or "ok": false with an "error" message. A "busy"
+# error means the search queue is full and the request should be retried later.
+DEFAULT_HOST = "127.0.0.1"
+# Same file as ChessOpeningBook.DEFAULT_BOOK_PATH; named here so that only the
+# workers import the book module
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+DEFAULT_PORT = 8765
+DEFAULT_DEPTH = 3
+MAX_DEPTH = 10
+DEFAULT_TIME_LIMIT = 5.0
+MAX_TIME_LIMIT = 60.0
+DEADLINE_GRACE = 1.0            # Time allowed past the deadline for a worker to reply
+SESSION_IDLE_TIMEOUT = 30 * 60  # Seconds before an unused game is dropped
+
+# Transposition tables kept between searches share one memory budget, split
+# evenly over the games currently open and capped per game, because each
+# "go" pickles the game's table to a worker and back. A game's table is cut
+# to its share after each of its searches, and every game's table once a
+# minute, so the total can only run over for the minute after many games
+# open at once. With a few hundred games each keeps thousands of positions;
+# with many thousands the shares become too small to save much search.
+TT_MEMORY_BUDGET = 256 * 2**20   # Bytes for all games together
+TT_ENTRY_BYTES = 180             # Measured: dict slot, int key and (depth, score, flag, move) tuple
+SESSION_TT_MAX_ENTRIES = 50000   # About 9 MB, 20 ms to pickle both ways
+
+class ServiceError(Exception):
+    """A request that cannot be served; the message is sent back to the client."""
+
+# --- 2. Worker Side ---
+
+def trim_tt(tt, limit):
+    """Drops the oldest entries so that `tt` holds at most `limit` positions."""
+    excess = len(tt) - limit
+    if excess > 0:
+        for key in list(itertools.islice(tt, excess)):
+            del tt[key]
+
+_worker_books = {}
+
+def worker_book(path):
+    """Opens the book at `path` once per worker process; None if it has not been built."""
+    if path not in _worker_books:
+        from ChessOpeningBook import open_default_book
+        _worker_books[path] = open_default_book(path)
+    return _worker_books[path]
+
+def search_worker(board, color, depth, deadline, tt, tt_entries, book_path=None):
+    """
+    Runs in a pool process. Plays a move from the book at `book_path` if it
+    knows the position, returning (None, [move], tt). Otherwise searches until
+    `depth` or the wall-clock `deadline`, whichever comes first, and returns
+    (score, pv, tt) so that the session keeps the updated table. The table is
+    cut back to `tt_entries` before it is sent back. If the deadline passed
+    while the request was queued, the first legal move is returned unsearched.
+    """
+    book = worker_book(book_path) if book_path else None
+    if book is not None:
+        book_move = book.pick_move(board, color)
+        if book_move:
+            return None, [book_move], tt
+    time_limit = max(0.0, deadline - time.time())
+    score, line = iterative_deepening(board, color, depth, tt=tt, time_limit=time_limit)
+    if not line:
+        line = get_all_moves(board, color)[:1]
+    trim_tt(tt, tt_entries)
+    return score, line, tt
+
+# --- 3. Game Sessions ---
+
+def move_to_text(move):
+    return f"{indices_to_chess_notation(move[0])} to {indices_to_chess_notation(move[1])}"
+
+class GameSession:
+    """One game: its own position, side to move and transposition-table slice."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.board = initial_board()
+        self.color = 'white'
+        self.tt = {}
+        self.lock = asyncio.Lock()      # One move or search at a time per game
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def play(self, start_pos, end_pos):
+        move_piece(self.board, start_pos, end_pos)
+        self.color = 'black' if self.color == 'white' else 'white'
+
+    def status(self):
+        if is_checkmate(self.board, self.color):
+            return 'checkmate'
+        if is_stalemate(self.board, self.color):
+            return 'stalemate'
+        return 'ongoing'
+
+    def board_rows(self):
+        return ["".join(piece or '.' for piece in row) for row in self.board]
+
+# --- 4. Service ---
+
+class EngineService:
+    """
+    Hosts many concurrent games in one process. Searches run on a bounded
+    process pool; at most `max_pending` may be queued or running at once and
+    further "go" requests are refused with "busy" instead of piling up. A
+    search counts against max_pending until its worker is done, even if the
+    client was already told that its deadline passed.
+    """
+
+    def __init__(self, workers=None, max_pending=64, max_sessions=10000,
+                 tt_memory=TT_MEMORY_BUDGET, idle_timeout=SESSION_IDLE_TIMEOUT, book_path=DEFAULT_BOOK_PATH):
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.book_path = book_path   # None: always search
+        self.max_pending = max_pending
+        self.max_sessions = max_sessions
+        self.tt_memory = tt_memory
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.pending = 0
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def tt_entries(self):
+        """Transposition-table entries each open game may keep right now."""
+        share = self.tt_memory // (TT_ENTRY_BYTES * max(1, len(self.sessions)))
+        return min(share, SESSION_TT_MAX_ENTRIES)
+
+    def release_slot(self, future):
+        """Frees the search slot of a worker that finished after its deadline."""
+        self.pending -= 1
+        if not future.cancelled():
+            future.exception()   # Retrieve it so a failed search is not logged as unhandled
+
+    def get_session(self, request):
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise ServiceError("unknown session")
+        session.touch()
+        return session
+
+    async def handle(self, request):
+        """Serves one request and returns the reply fields."""
+        command = request.get("cmd")
+        if command == "new":
+            if len(self.sessions) >= self.max_sessions:
+                raise ServiceError("too many sessions")
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = GameSession(session_id)
+            return {"session": session_id, "turn": 'white'}
+        if command == "move":
+            return await self.play_move(self.get_session(request), request)
+        if command == "go":
+            return await self.search(self.get_session(request), request)
+        if command == "board":
+            session = self.get_session(request)
+            return {"board": session.board_rows(), "turn": session.color}
+        if command == "close":
+            self.sessions.pop(request.get("session"), None)
+            return {}
+        if command == "stats":
+            return {"sessions": len(self.sessions), "pending": self.pending}
+        raise ServiceError(f"unknown command {command!r}")
+
+    async def play_move(self, session, request):
+        try:
+            start_pos, end_pos = parse_move(request["move"])
+        except (KeyError, ValueError, IndexError, TypeError, AttributeError):
+            raise ServiceError("move must look like 'e2 to e4'")
+        if not all(0 <= index < 8 for index in start_pos + end_pos):
+            raise ServiceError("move must look like 'e2 to e4'")
+        async with session.lock:
+            if not is_valid_move(session.board, start_pos, end_pos, session.color):
+                raise ServiceError("illegal move")
+            session.play(start_pos, end_pos)
+            return {"turn": session.color, "status": session.status()}
+
+    async def search(self, session, request):
+        try:
+            depth = min(int(request.get("depth", DEFAULT_DEPTH)), MAX_DEPTH)
+            time_limit = min(float(request.get("time_limit", DEFAULT_TIME_LIMIT)), MAX_TIME_LIMIT)
+        except (ValueError, TypeError, OverflowError):
+            raise ServiceError("depth and time_limit must be numbers")
+        if depth < 1 or not time_limit > 0:   # Also rejects NaN
+            raise ServiceError("depth and time_limit must be positive")
+        if self.pending >= self.max_pending:
+            raise ServiceError("busy")
+
+        # The deadline counts from arrival, so time spent queued is included
+        deadline = time.time() + time_limit
+        self.pending += 1
+        release = True
+        try:
+            async with session.lock:
+                if session.status() != 'ongoing':
+                    raise ServiceError("game is over")
+                loop = asyncio.get_running_loop()
+                book_path = self.book_path if request.get("book", True) else None
+                future = loop.run_in_executor(self.pool, search_worker, session.board, session.color,
+                                              depth, deadline, session.tt, self.tt_entries, book_path)
+                remaining = deadline - time.time() + DEADLINE_GRACE
+                try:
+                    # Shielded so that a timeout leaves the future to report when the worker is free
+                    score, line, tt = await asyncio.wait_for(asyncio.shield(future), remaining)
+                except asyncio.TimeoutError:
+                    release = False
+                    future.add_done_callback(self.release_slot)
+                    raise ServiceError("deadline exceeded")
+                session.tt = tt
+                trim_tt(session.tt, self.tt_entries)   # In case games opened during the search
+                reply = {"move": move_to_text(line[0]), "score": score,
+                         "pv": [move_to_text(move) for move in line]}
+                if score is None:
+                    reply["book"] = True
+                if request.get("play", True):
+                    session.play(*line[0])
+                    reply.update(turn=session.color, status=session.status())
+                return reply
+        finally:
+            if release:
+                self.pending -= 1
+
+    async def expire_sessions(self):
+        """
+        Periodically drops games that have been idle for too long and cuts
+        the remaining tables back to the share of the games still open.
+        """
+        while True:
+            await asyncio.sleep(60)
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id, session in list(self.sessions.items()):
+                if session.last_used < cutoff and not session.lock.locked():
+                    del self.sessions[session_id]
+            limit = self.tt_entries
+            for session in self.sessions.values():
+                trim_tt(session.tt, limit)
+
+    async def serve_client(self, reader, writer):
+        """Reads requests from one connection; each is handled in its own task."""
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as error:
+                request, reply = {}, {"ok": False, "error": f"bad request: {error}"}
+            else:
+                try:
+                    reply = {"ok": True, **await self.handle(request)}
+                except ServiceError as error:
+                    reply = {"ok": False, "error": str(error)}
+                except Exception as error:
+                    # A bug or a crashed worker must still get the client a reply
+                    reply = {"ok": False, "error": f"internal error: {type(error).__name__}"}
+            if "id" in request:
+                reply["id"] = request["id"]
+            async with write_lock:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **service_options):
+    """Runs the service until cancelled."""
+    service = EngineService(**service_options)
+    server = await asyncio.start_server(service.serve_client, host, port)
+    expiry = asyncio.create_task(service.expire_sessions())
+    print(f"Chess engine service listening on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        expiry.cancel()
+        service.close()
+
+def main():
+    """Command-line entry point: run the service on localhost."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve many chess games from one process.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="search processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=64, help="searches queued or running before 'busy'")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--tt-memory", type=int, default=TT_MEMORY_BUDGET // 2**20,
+                        help="MB of transposition tables kept across all games")
+    parser.add_argument("--book", default=DEFAULT_BOOK_PATH, help="Polyglot opening book used by the workers")
+    parser.add_argument("--no-book", action="store_true", help="always search, even in book positions")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_pending=args.max_pending,
+                          max_sessions=args.max_sessions, tt_memory=args.tt_memory * 2**20,
+                          book_path=None if args.no_book else args.book))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
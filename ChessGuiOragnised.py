@@ -3,7 +3,7 @@ from tkinter import messagebox
 from PIL import Image, ImageTk
 import os
 from ChessBoardOrganised import (
-    board,
+    initial_board,
     move_piece,
     is_valid_move,
     get_best_move_ab,
@@ -11,6 +11,7 @@ from ChessBoardOrganised import (
     is_stalemate,
     indices_to_chess_notation,
 )
+from ChessOpeningBook import open_default_book
 
 CELL_SIZE = 60
 
@@ -22,7 +23,9 @@ class ChessGUI:
         self.canvas.pack()
         self.selected = None
         self.color_turn = "white"
+        self.board = initial_board()
         self.piece_images = self.load_piece_images()
+        self.book = open_default_book()
         self.draw_board()
         self.canvas.bind("<Button-1>", self.on_click)
 
@@ -52,7 +55,7 @@ class ChessGUI:
                 if self.selected == (row, col):
                     self.canvas.create_rectangle(x1, y1, x2, y2, outline="red", width=3)
 
-                piece = board[row][col]
+                piece = self.board[row][col]
                 if piece:
                     img = self.piece_images.get(piece)
                     if img:
@@ -65,8 +68,8 @@ class ChessGUI:
 
         if self.selected:
             start_row, start_col = self.selected
-            if is_valid_move(board, (start_row, start_col), (row, col), self.color_turn):
-                move_piece(board, (start_row, start_col), (row, col))
+            if is_valid_move(self.board, (start_row, start_col), (row, col), self.color_turn):
+                move_piece(self.board, (start_row, start_col), (row, col))
                 print(
                     f"{self.color_turn.capitalize()} moved from {indices_to_chess_notation((start_row, start_col))} "
                     f"to {indices_to_chess_notation((row, col))}"
@@ -75,10 +78,10 @@ class ChessGUI:
                 self.color_turn = "black"
                 self.draw_board()
 
-                if is_checkmate(board, "black"):
+                if is_checkmate(self.board, "black"):
                     messagebox.showinfo("Game Over", "Checkmate! White wins!")
                     return
-                if is_stalemate(board, "black"):
+                if is_stalemate(self.board, "black"):
                     messagebox.showinfo("Game Over", "Stalemate! Draw!")
                     return
 
@@ -88,27 +91,27 @@ class ChessGUI:
                 self.selected = None
         else:
             if (
-                board[row][col]
+                self.board[row][col]
                 and self.color_turn == "white"
-                and board[row][col].isupper()
+                and self.board[row][col].isupper()
             ):
                 self.selected = (row, col)
 
         self.draw_board()
 
     def ai_move(self):
-        best_move = get_best_move_ab(board, "black", depth=3)
+        best_move = get_best_move_ab(self.board, "black", depth=3, book=self.book)
         if best_move:
-            move_piece(board, best_move[0], best_move[1])
+            move_piece(self.board, best_move[0], best_move[1])
             print(
                 f"AI moved from {indices_to_chess_notation(best_move[0])} to {indices_to_chess_notation(best_move[1])}"
             )
             self.color_turn = "white"
             self.draw_board()
 
-            if is_checkmate(board, "white"):
+            if is_checkmate(self.board, "white"):
                 messagebox.showinfo("Game Over", "Checkmate! Black wins!")
-            elif is_stalemate(board, "white"):
+            elif is_stalemate(self.board, "white"):
                 messagebox.showinfo("Game Over", "Stalemate! Draw!")
         else:
             messagebox.showinfo("Game Over", "No valid moves for AI.")
@@ -0,0 +1,208 @@
+import os
+import struct
+import sys
+import time
+
+# --- 1. Cache File Layout ---
+# Precomputed tables can be cached in a small binary file that imports read
+# instead of recomputing them; this mostly saves importing `random`. The cache
+# is written by `python ChessTables.py`, never as a side effect of an import.
+# All integers are little-endian:
+#   magic "CTAB" | version (uint32)
+#   engine Zobrist keys      769 x uint64  (12 pieces x 64 squares, then black to move)
+#   knight / king targets    64 x 8 bytes each, padded with 0xFF
+#   rook / bishop rays       64 x 4 rays x 7 bytes each, padded with 0xFF
+# Bump TABLES_VERSION whenever the contents or layout change; a cache with
+# another version is ignored and the tables are computed instead.
+TABLES_MAGIC = b"CTAB"
+TABLES_VERSION = 2
+DEFAULT_TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chess_tables.bin")
+
+ZOBRIST_PIECES = 'PNBRQKpnbrqk'
+ZOBRIST_SEED = 0xC0FFEE
+ZOBRIST_COUNT = len(ZOBRIST_PIECES) * 64 + 1
+
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2)]
+KING_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+PAD = 0xFF
+
+HEADER_FORMAT = "<4sI"
+TARGETS_SIZE = 64 * 8
+RAYS_SIZE = 64 * 4 * 7
+
+# Imports of the command-line tools should stay within this many seconds.
+# Two entry points are not budgeted:
+#   ChessEngineService  a long-running server that needs asyncio and
+#                       concurrent.futures, about 70 ms of standard library on
+#                       their own; once per server start, paid before it listens
+#   ChessGuiOragnised   Tk and PIL dominate its start-up, and neither is
+#                       available on a headless machine to measure
+IMPORT_TIME_BUDGET = 0.05
+BUDGETED_MODULES = ("ChessTables", "ChessBoardOrganised", "ChessOpeningBook", "ChessBitbase")
+
+class PrecomputedTables:
+    """Zobrist keys and attack tables, as plain lists."""
+
+    def __init__(self, zobrist, knight_targets, king_targets, rook_rays, bishop_rays):
+        self.zobrist = zobrist
+        self.knight_targets = knight_targets
+        self.king_targets = king_targets
+        self.rook_rays = rook_rays
+        self.bishop_rays = bishop_rays
+
+# --- 2. Generation ---
+
+def build_targets(offsets):
+    """For each square (row * 8 + col), the squares one offset away."""
+    targets = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        targets.append([(row + dr) * 8 + col + dc for dr, dc in offsets
+                        if 0 <= row + dr < 8 and 0 <= col + dc < 8])
+    return targets
+
+def build_rays(directions):
+    """For each square, the squares walked outwards in each direction."""
+    rays = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        square_rays = []
+        for dr, dc in directions:
+            ray = []
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                ray.append(r * 8 + c)
+                r += dr
+                c += dc
+            square_rays.append(ray)
+        rays.append(square_rays)
+    return rays
+
+def generate_tables():
+    """Computes every table from scratch."""
+    import random   # Only needed when the cache is missing or stale
+    zobrist_source = random.Random(ZOBRIST_SEED)
+    return PrecomputedTables(
+        [zobrist_source.getrandbits(64) for _ in range(ZOBRIST_COUNT)],
+        build_targets(KNIGHT_OFFSETS),
+        build_targets(KING_OFFSETS),
+        build_rays(ROOK_DIRECTIONS),
+        build_rays(BISHOP_DIRECTIONS),
+    )
+
+# --- 3. Serialisation ---
+
+def _pack_squares(squares, width):
+    return bytes(squares) + bytes([PAD] * (width - len(squares)))
+
+def _unpack_squares(data):
+    end = data.find(PAD)
+    return list(data if end < 0 else data[:end])
+
+def encode_tables(tables):
+    parts = [struct.pack(HEADER_FORMAT, TABLES_MAGIC, TABLES_VERSION),
+             struct.pack(f"<{ZOBRIST_COUNT}Q", *tables.zobrist)]
+    for targets in (tables.knight_targets, tables.king_targets):
+        parts.extend(_pack_squares(squares, 8) for squares in targets)
+    for rays in (tables.rook_rays, tables.bishop_rays):
+        parts.extend(_pack_squares(ray, 7) for square_rays in rays for ray in square_rays)
+    return b"".join(parts)
+
+def decode_tables(data):
+    """Rebuilds the tables from a cache buffer; returns None if it is stale or damaged."""
+    header_size = struct.calcsize(HEADER_FORMAT)
+    expected = header_size + 8 * ZOBRIST_COUNT + 2 * TARGETS_SIZE + 2 * RAYS_SIZE
+    if len(data) != expected or struct.unpack_from(HEADER_FORMAT, data) != (TABLES_MAGIC, TABLES_VERSION):
+        return None
+    offset = header_size
+    zobrist = list(struct.unpack_from(f"<{ZOBRIST_COUNT}Q", data, offset))
+    offset += 8 * ZOBRIST_COUNT
+
+    targets = []
+    for _ in range(2):
+        block = data[offset:offset + TARGETS_SIZE]
+        targets.append([_unpack_squares(block[sq * 8:sq * 8 + 8]) for sq in range(64)])
+        offset += TARGETS_SIZE
+    rays = []
+    for _ in range(2):
+        block = data[offset:offset + RAYS_SIZE]
+        rays.append([[_unpack_squares(block[(sq * 4 + d) * 7:(sq * 4 + d) * 7 + 7]) for d in range(4)]
+                     for sq in range(64)])
+        offset += RAYS_SIZE
+    return PrecomputedTables(zobrist, targets[0], targets[1], rays[0], rays[1])
+
+def write_tables(tables, path=DEFAULT_TABLES_PATH):
+    """Writes the cache atomically so a concurrent import never maps a partial file."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(encode_tables(tables))
+    os.replace(temp_path, path)
+
+# --- 4. Loading ---
+
+_loaded = None
+
+def load_tables(path=DEFAULT_TABLES_PATH):
+    """
+    Returns the precomputed tables, read from the cache file if it is current
+    and computed in memory otherwise. Loaded once per process; nothing is written.
+    """
+    global _loaded
+    if _loaded is not None:
+        return _loaded
+    tables = None
+    try:
+        with open(path, "rb") as f:
+            tables = decode_tables(f.read())
+    except OSError:
+        pass   # No cache: compute below
+    if tables is None:
+        tables = generate_tables()
+    _loaded = tables
+    return tables
+
+# --- 5. Import-Time Budget ---
+
+def measure_import_time(module):
+    """Seconds a fresh interpreter spends importing `module` (interpreter startup excluded)."""
+    import subprocess
+    code = (f"import time; start = time.perf_counter(); import {module}; "
+            f"print(time.perf_counter() - start)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(result.stdout.strip())
+
+def check_import_time(modules=BUDGETED_MODULES, budget=IMPORT_TIME_BUDGET):
+    """Returns [(module, seconds)] for the modules whose import exceeds the budget."""
+    import compileall
+    # Imports are timed from up-to-date bytecode, as installed code runs, not from source
+    compileall.compile_dir(os.path.dirname(os.path.abspath(__file__)), maxlevels=0, quiet=1)
+    over = []
+    for module in modules:
+        seconds = measure_import_time(module)
+        if seconds > budget:
+            over.append((module, seconds))
+    return over
+
+def main():
+    """Command-line entry point: rebuild the cache, or check the import-time budget."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage the precomputed table cache.")
+    parser.add_argument("--check-import-time", action="store_true",
+                        help=f"fail if importing a command-line tool takes over {IMPORT_TIME_BUDGET * 1000:.0f} ms")
+    args = parser.parse_args()
+
+    if args.check_import_time:
+        over = check_import_time()
+        for module, seconds in over:
+            print(f"{module}: {seconds * 1000:.1f} ms exceeds the {IMPORT_TIME_BUDGET * 1000:.0f} ms budget")
+        sys.exit(1 if over else 0)
+
+    start = time.perf_counter()
+    write_tables(generate_tables())
+    print(f"Wrote {DEFAULT_TABLES_PATH} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
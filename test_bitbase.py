@@ -0,0 +1,52 @@
+import pytest
+
+import ChessBitbase
+from ChessBoardOrganised import alphabeta, get_best_move_ab, is_checkmate, iterative_deepening, move_piece
+
+@pytest.fixture(scope="module")
+def bitbases():
+    """Solves KRK and KQK in memory (about ten seconds) in place of bitbases.bin."""
+    saved = ChessBitbase._bitbases
+    ChessBitbase._bitbases = {kind: bytes(ChessBitbase.generate_table(kind)) for kind in ChessBitbase.ENDINGS}
+    yield
+    ChessBitbase._bitbases = saved
+
+def position(*pieces):
+    """Builds a board from (piece, 'e4')-style pairs."""
+    board = [[None] * 8 for _ in range(8)]
+    for piece, square in pieces:
+        board[8 - int(square[1])][ord(square[0]) - ord('a')] = piece
+    return board
+
+def kqk_mate_in_one():
+    """White Kg6 Qa1, black kg8, white to move: Qa8 is mate."""
+    return position(('K', 'g6'), ('Q', 'a1'), ('k', 'g8'))
+
+def test_probe_sees_the_win(bitbases):
+    assert ChessBitbase.probe(kqk_mate_in_one(), 'white') == 'white'
+    assert ChessBitbase.lookup(kqk_mate_in_one(), 'white') == ('white', 2)   # Mate in one ply
+
+def test_negamax_prefers_mate_to_bitbase_win(bitbases):
+    score, line = iterative_deepening(kqk_mate_in_one(), 'white', 3)
+    assert line[0] == ((7, 0), (0, 0))
+    assert score > ChessBitbase.WIN_SCORE
+
+def test_alphabeta_prefers_mate_to_bitbase_win(bitbases):
+    score, move = alphabeta(kqk_mate_in_one(), 2, float('-inf'), float('inf'), True, 'white')
+    assert move == ((7, 0), (0, 0))
+    assert score > ChessBitbase.WIN_SCORE
+
+@pytest.mark.parametrize("pieces, color", [
+    ((('K', 'e1'), ('R', 'a5'), ('k', 'e8')), 'white'),
+    ((('K', 'a1'), ('R', 'h1'), ('k', 'e5')), 'white'),
+    ((('K', 'e1'), ('Q', 'a5'), ('k', 'e8')), 'white'),
+    ((('K', 'e1'), ('k', 'e3'), ('r', 'h8')), 'black'),
+])
+def test_won_ending_is_mated_within_its_distance(bitbases, pieces, color):
+    board = position(*pieces)
+    strong, entry = ChessBitbase.lookup(board, color)
+    plies_to_mate = entry - 1
+    for _ in range(plies_to_mate):
+        move_piece(board, *get_best_move_ab(board, color, depth=3))
+        color = 'black' if color == 'white' else 'white'
+    assert is_checkmate(board, color)
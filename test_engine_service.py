@@ -0,0 +1,112 @@
+import asyncio
+import json
+import struct
+
+import pytest
+
+import ChessEngineService
+from ChessEngineService import SESSION_TT_MAX_ENTRIES, TT_ENTRY_BYTES, EngineService, ServiceError
+
+async def exchange(requests, **service_options):
+    """Sends requests to a service on a free local port and returns the replies by id."""
+    service = EngineService(workers=1, **service_options)
+    server = await asyncio.start_server(service.serve_client, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(json.dumps({"id": "new", "cmd": "new"}).encode() + b"\n")
+        session = json.loads(await reader.readline())["session"]
+        for request in requests:
+            writer.write(json.dumps({"session": session, **request}).encode() + b"\n")
+        replies = {}
+        for _ in requests:
+            reply = json.loads(await asyncio.wait_for(reader.readline(), 10))
+            replies[reply["id"]] = reply
+        writer.close()
+        return replies
+    finally:
+        server.close()
+        service.close()
+
+def test_bad_requests_get_an_error_reply():
+    replies = asyncio.run(exchange([
+        {"id": "text depth", "cmd": "go", "depth": "abc"},
+        {"id": "null depth", "cmd": "go", "depth": None},
+        {"id": "nan time", "cmd": "go", "time_limit": "nan"},
+        {"id": "off board", "cmd": "move", "move": "z9 to e4"},
+        {"id": "row 9", "cmd": "move", "move": "a9 to a1"},
+        {"id": "not text", "cmd": "move", "move": 42},
+    ]))
+    assert len(replies) == 6
+    for reply in replies.values():
+        assert reply["ok"] is False and reply["error"]
+
+def test_legal_move_is_played():
+    replies = asyncio.run(exchange([{"id": "e4", "cmd": "move", "move": "e2 to e4"}]))
+    assert replies["e4"] == {"ok": True, "turn": "black", "status": "ongoing", "id": "e4"}
+
+def test_go_searches_in_the_pool_and_plays_the_move():
+    replies = asyncio.run(exchange([{"id": "go", "cmd": "go", "depth": 2, "time_limit": 10}]))
+    reply = replies["go"]
+    assert reply["ok"] is True
+    assert reply["move"] == reply["pv"][0]
+    assert reply["turn"] == "black" and reply["status"] == "ongoing"
+
+def test_go_plays_book_moves_without_searching(tmp_path):
+    book = tmp_path / "book.bin"
+    # e2e4 in Polyglot's move encoding, keyed by the start position
+    book.write_bytes(struct.pack(">QHHI", 0x463B96181691FC9C, 0x031C, 1, 0))
+    replies = asyncio.run(exchange([
+        {"id": "book", "cmd": "go", "play": False},
+        {"id": "search", "cmd": "go", "depth": 1, "play": False, "book": False},
+    ], book_path=str(book)))
+    assert replies["book"]["move"] == "e2 to e4" and replies["book"]["book"] is True
+    assert replies["book"]["score"] is None
+    assert "book" not in replies["search"] and replies["search"]["score"] is not None
+
+def test_search_beyond_max_pending_is_busy():
+    async def run():
+        service = EngineService(workers=1, max_pending=1)
+        try:
+            first = (await service.handle({"cmd": "new"}))["session"]
+            second = (await service.handle({"cmd": "new"}))["session"]
+            search = asyncio.create_task(service.handle({"cmd": "go", "session": first, "depth": 3}))
+            await asyncio.sleep(0)   # Let the first search take the only slot
+            with pytest.raises(ServiceError, match="busy"):
+                await service.handle({"cmd": "go", "session": second, "depth": 3})
+            assert "move" in await search
+            assert service.pending == 0
+        finally:
+            service.close()
+    asyncio.run(run())
+
+def test_missed_deadline_keeps_its_slot_until_the_worker_is_done(monkeypatch):
+    # A negative grace gives up on the reply before the worker's own deadline
+    monkeypatch.setattr(ChessEngineService, "DEADLINE_GRACE", -0.4)
+
+    async def run():
+        service = EngineService(workers=1)
+        try:
+            session = (await service.handle({"cmd": "new"}))["session"]
+            with pytest.raises(ServiceError, match="deadline exceeded"):
+                await service.handle({"cmd": "go", "session": session, "depth": 8, "time_limit": 0.5})
+            assert service.pending == 1
+            for _ in range(100):
+                if service.pending == 0:
+                    break
+                await asyncio.sleep(0.1)
+            assert service.pending == 0
+        finally:
+            service.close()
+    asyncio.run(run())
+
+def test_table_budget_is_shared_by_open_games():
+    service = EngineService(workers=1, tt_memory=TT_ENTRY_BYTES * 100000)
+    try:
+        assert service.tt_entries == SESSION_TT_MAX_ENTRIES
+        service.sessions = dict.fromkeys(range(10))
+        assert service.tt_entries == 10000
+        service.sessions = dict.fromkeys(range(1000))
+        assert service.tt_entries == 100
+    finally:
+        service.close()
@@ -0,0 +1,5 @@
+from ChessTables import IMPORT_TIME_BUDGET, check_import_time
+
+def test_engine_imports_within_budget():
+    over = check_import_time()
+    assert over == [], f"imports over the {IMPORT_TIME_BUDGET * 1000:.0f} ms budget: {over}"
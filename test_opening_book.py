@@ -0,0 +1,51 @@
+import struct
+
+import pytest
+
+from ChessBoardOrganised import initial_board, move_piece
+from ChessOpeningBook import (
+    ENTRY_FORMAT,
+    START_POSITION_KEY,
+    OpeningBook,
+    build_book,
+    polyglot_key,
+    read_pgn_games,
+    resolve_san,
+)
+
+def test_keys_match_reference_polyglot():
+    board = initial_board()
+    assert polyglot_key(board, 'white') == START_POSITION_KEY == 0x463B96181691FC9C
+    move_piece(board, (6, 4), (4, 4))    # e4
+    assert polyglot_key(board, 'black') == 0x823C9B50FD114196
+    move_piece(board, (1, 3), (3, 3))    # d5
+    assert polyglot_key(board, 'white') == 0x0756B94461C50FB0
+
+def test_reads_book_written_by_another_tool(tmp_path):
+    path = tmp_path / "book.bin"
+    # e2e4 in Polyglot's own move encoding, keyed by the reference start position hash
+    path.write_bytes(struct.pack(ENTRY_FORMAT, 0x463B96181691FC9C, 0x031C, 10, 0))
+    with OpeningBook(str(path)) as book:
+        assert book.pick_move(initial_board(), 'white') == ((6, 4), (4, 4))
+
+def test_reads_every_game_of_a_pgn_file(tmp_path):
+    path = tmp_path / "games.pgn"
+    path.write_text('[Event "A"]\n[Result "1-0"]\n\n1. e4 e5 2. Nf3 {main line} Nc6 1-0\n\n'
+                    '[Event "B"]\n[Result "0-1"]\n\n1. d4 (1. c4) d5\n2. c4 0-1\n')
+    assert list(read_pgn_games(str(path))) == [
+        (['e4', 'e5', 'Nf3', 'Nc6'], '1-0'),
+        (['d4', 'd5', 'c4'], '0-1'),
+    ]
+
+@pytest.mark.parametrize("san, color", [("a1", 'white'), ("h8", 'black'), ("bxa1", 'white')])
+def test_pawn_move_to_own_back_rank_is_rejected(san, color):
+    with pytest.raises(ValueError):
+        resolve_san(initial_board(), color, san)
+
+def test_malformed_game_does_not_abort_the_build(tmp_path):
+    pgn = tmp_path / "games.pgn"
+    pgn.write_text('[Result "*"]\n\n1. e4 e5 2. a1 *\n\n[Result "1-0"]\n\n1. d4 d5 1-0\n')
+    out = tmp_path / "book.bin"
+    build_book([str(pgn)], str(out))
+    with OpeningBook(str(out)) as book:
+        assert book.pick_move(initial_board(), 'white') in (((6, 4), (4, 4)), ((6, 3), (4, 3)))
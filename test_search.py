@@ -0,0 +1,22 @@
+from ChessBoardOrganised import initial_board, is_valid_move, iterative_deepening, move_piece
+
+def play_line(board, color, line):
+    """Plays a principal variation, checking that every move in it is legal."""
+    for start_pos, end_pos in line:
+        assert is_valid_move(board, start_pos, end_pos, color)
+        move_piece(board, start_pos, end_pos)
+        color = 'black' if color == 'white' else 'white'
+
+def test_pv_is_as_long_as_the_search():
+    for depth in range(1, 7):
+        score, line = iterative_deepening(initial_board(), 'white', depth)
+        assert len(line) == depth
+        play_line(initial_board(), 'white', line)
+
+def test_pv_survives_a_shared_transposition_table():
+    # A second search finds every position already stored, as a service game's table does
+    tt = {}
+    for _ in range(2):
+        score, line = iterative_deepening(initial_board(), 'white', 5, tt=tt)
+        assert len(line) == 5
+        play_line(initial_board(), 'white', line)